@@ -1,5 +1,4 @@
 from graphedexcel.cli import main
-from graphedexcel import logger_config  # noqa: F401
 
 if __name__ == "__main__":
     main()
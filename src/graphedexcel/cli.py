@@ -4,7 +4,7 @@ import argparse
 import logging
 from .graphbuilder import build_graph_and_stats
 from .graph_summarizer import print_summary
-from .graph_visualizer import visualize_dependency_graph
+from .logger_config import configure_logging
 
 logger = logging.getLogger("graphedexcel.cli")
 
@@ -74,6 +74,14 @@ def parse_arguments():
         default=None,
     )
 
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="Write detailed debug logging for every formula to app.log.",
+        default=False,
+    )
+
     return parser.parse_args()
 
 
@@ -82,6 +90,10 @@ def main():
 
     path_to_excel = args.path_to_excel
 
+    # Done here, as the installed graphedexcel command runs main() directly,
+    # without going through __main__.py
+    configure_logging(args.verbose)
+
     # Check if the file exists
     if not os.path.exists(path_to_excel):
         logger.error(f"File not found: {path_to_excel}")
@@ -89,10 +101,13 @@ def main():
 
         sys.exit(1)
 
-    # Build the dependency graph and gather statistics
+    # Build the dependency graph and gather statistics. Sheets of larger
+    # workbooks are parsed in parallel, except with --verbose, as worker
+    # processes that are not forked do not have the app.log handler.
     dependency_graph, function_stats = build_graph_and_stats(
         path_to_excel,
         as_directed=args.as_directed_graph,
+        parallel=False if args.verbose else None,
     )
 
     # Print summary of the dependency graph
@@ -118,6 +133,9 @@ def main():
         base_name = os.path.splitext(os.path.basename(path_to_excel))[0]
         filename = f"{base_name}_dependency_graph.png"
 
+    # Imported here, so runs with --no-visualize do not load matplotlib
+    from .graph_visualizer import visualize_dependency_graph
+
     # Visualize the dependency graph
     visualize_dependency_graph(
         dependency_graph, filename, config_path, layout, args.hide_legends
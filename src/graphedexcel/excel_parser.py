@@ -1,17 +1,150 @@
-from openpyxl.utils import get_column_letter, range_boundaries
-import re
-from typing import List, Tuple, Dict
+from functools import lru_cache
+from openpyxl.formula.translate import Translator
+from openpyxl.worksheet.formula import ArrayFormula
+from openpyxl.utils import coordinate_to_tuple, get_column_letter, range_boundaries
+from openpyxl.xml.constants import SHEET_MAIN_NS
+from openpyxl.xml.functions import iterparse
+from typing import IO, Iterator, List, Optional, Tuple, Dict
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
-# Regex to detect cell references like A1, B2, or ranges like A1:B2
-CELL_REF_REGEX = r"('?[A-Za-z0-9_\-\[\] ]+'?![A-Z]{1,3}[0-9]+(:[A-Z]{1,3}[0-9]+)?)|([A-Z]{1,3}[0-9]+(:[A-Z]{1,3}[0-9]+)?)"  # noqa
+_ROW_TAG = f"{{{SHEET_MAIN_NS}}}row"
+_CELL_TAG = f"{{{SHEET_MAIN_NS}}}c"
+_FORMULA_TAG = f"{{{SHEET_MAIN_NS}}}f"
+
+# Workbooks often repeat the same formula text and the same ranges many times,
+# so the results of scanning formulas and expanding ranges are cached.
+FORMULA_CACHE_SIZE = 100_000
+RANGE_CACHE_SIZE = 1024
+
+# Regex to detect cell references like A1, $B$2, or ranges like A1:B2. They may be
+# qualified with a sheet name, quoted or not: Sheet2!A1, 'My Sheet'!A1:B2.
+# String literals and quoted sheet names are matched as a whole (without capturing
+# a reference), so the text inside them is skipped. The lookarounds keep parts of
+# longer identifiers (ABCD1, Table1[Col]) and function names like LOG10( out.
+# re2 does not support lookarounds, so the pattern runs on re. It was measured to
+# stay linear on long unterminated quotes, escaped quotes and identifiers.
+_CELL_REGEX = r"\$?[A-Z]{1,3}\$?[0-9]+"
+CELL_REF_REGEX = (
+    r'"[^"]*"?'
+    r"|(?:('(?:[^']|'')*')!|(?<![\w.$\[\]])(?:([\w.$\[\]]+)!)?)"
+    rf"({_CELL_REGEX}(?::{_CELL_REGEX})?)"
+    r"(?![\w.$\[\](!])"
+    r"|'(?:[^']|'')*'?"
+)
+_CELL_REF_RE = re.compile(CELL_REF_REGEX)
+
+
+def iter_formulas(ws) -> Iterator[Tuple[str, str]]:
+    """
+    Yield the coordinate and formula of every formula cell in a worksheet.
+
+    For read-only worksheets the sheet XML is streamed directly, so only cells
+    with a formula are looked at instead of creating a cell object for every
+    cell. For other worksheets only the cells that have a value are visited.
+
+    Args:
+        ws: The openpyxl worksheet to read.
+
+    Returns:
+        Iterator[Tuple[str, str]]: (coordinate, formula) pairs like ('A1', '=B1+C1').
+    """
+    get_source = getattr(ws, "_get_source", None)
+    if get_source is not None:
+        with get_source() as source:
+            yield from iter_sheet_xml_formulas(source)
+        return
+
+    # Only the cells that exist, instead of every cell in the used range
+    cells = getattr(ws, "_cells", None)
+    if cells is not None:
+        cells = cells.values()
+    else:
+        cells = (cell for row in ws.iter_rows() for cell in row)
+
+    for cell in cells:
+        if cell.data_type != "f":
+            continue
+        formula = cell.value
+        if isinstance(formula, ArrayFormula):
+            formula = formula.text
+        if isinstance(formula, str):
+            yield cell.coordinate, formula
+
+
+def iter_sheet_xml_formulas(source: IO[bytes]) -> Iterator[Tuple[str, str]]:
+    """
+    Stream a worksheet XML part and yield (coordinate, formula) pairs.
+
+    Shared formulas are translated to the cell they are used in, the same way
+    openpyxl does when loading a workbook. Data table formulas have no text
+    and are skipped.
+    """
+    shared_formulas: Dict[str, Translator] = {}
+    row = 0
+    column: Optional[int] = 0
+    last_coordinate = None
+
+    for event, element in iterparse(source, events=("start", "end")):
+        if element.tag == _ROW_TAG:
+            if event == "start":
+                row = int(element.get("r", row + 1))
+                column = 0
+            else:
+                element.clear()
+            continue
+
+        if event != "end" or element.tag != _CELL_TAG:
+            continue
+
+        # Cell references are optional in the file format, in which case the
+        # position follows from the previous cell in the row.
+        coordinate = element.get("r")
+        if coordinate is not None:
+            last_coordinate = coordinate
+            column = None
+        else:
+            if column is None:
+                column = coordinate_to_tuple(last_coordinate)[1]
+            column += 1
+            coordinate = f"{get_column_letter(column)}{row}"
+
+        formula_element = element.find(_FORMULA_TAG)
+        if formula_element is not None:
+            formula = _read_formula(formula_element, coordinate, shared_formulas)
+            if formula:
+                yield coordinate, formula
+
+        element.clear()
+
+
+def _read_formula(
+    formula_element, coordinate: str, shared_formulas: Dict[str, Translator]
+) -> Optional[str]:
+    """
+    Get the formula of a cell from its <f> element, or None if it has none.
+    """
+    formula_type = formula_element.get("t")
+    text = formula_element.text
+
+    if formula_type == "shared":
+        index = formula_element.get("si")
+        if index in shared_formulas:
+            return shared_formulas[index].translate_formula(coordinate)
+        if text:
+            shared_formulas[index] = Translator(f"={text}", coordinate)
+
+    elif formula_type == "dataTable":
+        return None
+
+    return f"={text}" if text else None
 
 
 def extract_references(formula: str) -> Tuple[List[str], List[str], Dict[str, str]]:
     """
-    Extract all referenced cells and ranges from a formula using regular expressions.
+    Extract all referenced cells and ranges from a formula.
     This returns a list of both individual cells and range references.
 
     Args:
@@ -21,32 +154,51 @@ def extract_references(formula: str) -> Tuple[List[str], List[str], Dict[str, st
         Tuple[List[str], List[str], Dict[str, str]]: A tuple containing lists of direct references,
         range references, and a dictionary of dependencies.
     """
-    formula = formula.replace("$", "")
-    matches = re.findall(CELL_REF_REGEX, formula)
-    references = [match[0] if match[0] else match[2] for match in matches]
-
-    # Trim the extracted references
-    references = [ref.strip() for ref in references]
-
-    expanded_references = []
     dependencies = {}
     direct_references = []
     range_references = []
 
-    for reference in references:
+    for reference in scan_references(formula):
         if ":" in reference:  # it's a range like A1:A3
-            expanded_cells = expand_range(reference)
-            expanded_references.extend(expanded_cells)
             range_references.append(reference)
             # Store the range-to-cells relationship
-            for cell in expanded_cells:
-                dependencies[cell] = reference
+            dependencies.update(
+                dict.fromkeys(expand_range_cached(reference), reference)
+            )
         else:  # single cell
             direct_references.append(reference)
 
     return direct_references, range_references, dependencies
 
 
+@lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def scan_references(formula: str) -> Tuple[str, ...]:
+    """
+    Find the cell and range references in a formula, in the order they appear,
+    e.g. 'A1', 'A1:B2', 'Sheet2!A1' or "'My Sheet'!A1".
+
+    Absolute markers ($) are dropped. String literals, function names and other
+    identifiers are skipped. Results are cached by formula text, which is why
+    a tuple is returned.
+
+    Args:
+        formula (str): The formula to scan.
+
+    Returns:
+        Tuple[str, ...]: The references found in the formula.
+    """
+    references = []
+    for quoted_sheet, sheet, reference in _CELL_REF_RE.findall(formula):
+        if not reference:  # a skipped string literal or quoted sheet name
+            continue
+        # The $ markers are stripped per match, as matches are short
+        reference = reference.replace("$", "")
+        sheet = quoted_sheet or sheet
+        references.append(f"{sheet}!{reference}" if sheet else reference)
+
+    return tuple(references)
+
+
 def expand_range(range_reference: str) -> List[str]:
     """
     Expand a range reference (e.g., 'A1:A3') into a list of individual cell references.
@@ -57,9 +209,10 @@ def expand_range(range_reference: str) -> List[str]:
     Returns:
         List[str]: A list of individual cell references.
     """
-    # if there is a sheet name in the range reference, put it away for now
+    # if there is a sheet name in the range reference, put it away for now.
+    # Quoted sheet names may contain "!" themselves, so split on the last one.
     if "!" in range_reference:
-        sheet_name, range_reference = range_reference.split("!")
+        sheet_name, range_reference = range_reference.rsplit("!", 1)
     else:
         sheet_name = None
 
@@ -76,3 +229,19 @@ def expand_range(range_reference: str) -> List[str]:
                 expanded_cells.append(cell_ref)
 
     return expanded_cells
+
+
+@lru_cache(maxsize=RANGE_CACHE_SIZE)
+def expand_range_cached(range_reference: str) -> Tuple[str, ...]:
+    """
+    Cached version of expand_range, returning a tuple of cell references.
+    """
+    return tuple(expand_range(range_reference))
+
+
+def clear_caches() -> None:
+    """
+    Free the cached formula scans and range expansions of the last build.
+    """
+    scan_references.cache_clear()
+    expand_range_cached.cache_clear()
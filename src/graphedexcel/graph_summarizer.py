@@ -1,4 +1,6 @@
 from collections import Counter
+import heapq
+from operator import itemgetter
 import networkx as nx
 
 
@@ -32,9 +34,7 @@ def print_basic_info(graph, strpadsize, numpadsize):
 
 def print_highest_degree_nodes(graph, strpadsize, numpadsize):
     print("\n===  Most connected nodes     ===")
-    degree_view = graph.degree()
-    degree_counts = Counter(dict(degree_view))
-    max_degree_node = degree_counts.most_common(10)
+    max_degree_node = heapq.nlargest(10, graph.degree(), key=itemgetter(1))
 
     for node, degree in max_degree_node:
         print(f"{node.ljust(strpadsize)}{str(degree).rjust(numpadsize, ' ')} ")
@@ -42,9 +42,8 @@ def print_highest_degree_nodes(graph, strpadsize, numpadsize):
 
 def print_most_used_functions(functionsdict, strpadsize, numpadsize):
     print("\n===  Most used functions      ===")
-    sorted_functions = dict(
-        sorted(functionsdict.items(), key=lambda item: item[1], reverse=True)
-    )
+    if not isinstance(functionsdict, Counter):
+        functionsdict = Counter(functionsdict)
 
-    for function, count in sorted_functions.items():
+    for function, count in functionsdict.most_common():
         print(f"{function.ljust(strpadsize, ' ')}{str(count).rjust(numpadsize, ' ')}")
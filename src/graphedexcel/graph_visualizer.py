@@ -1,16 +1,11 @@
+import heapq
 import json
-import matplotlib
-import matplotlib.patches as mpatches
+from operator import itemgetter
 import networkx as nx
-import matplotlib.pyplot as plt
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Use a non-interactive backend for matplotlib.
-# No need to show plots, just save them.
-matplotlib.use("Agg")
-
 # Default settings for the graph visualization
 base_graph_settings = {
     "node_size": 50,  # the size of the node
@@ -38,6 +33,14 @@ large_graph_settings = {
     "alpha": 0.2,
 }
 
+# Larger graphs are reduced to their most connected nodes before drawing.
+# Beyond this the layout takes very long and the image is unreadable anyway.
+MAX_VISUALIZED_NODES = 2000
+
+# From this size the spring layout uses graphviz sfdp if pygraphviz is
+# installed, or fewer spring layout iterations otherwise.
+FAST_LAYOUT_MIN_NODES = 500
+
 
 def load_json_config(config_path: str) -> dict:
     """
@@ -117,10 +120,28 @@ def calculate_fig_size(graph_size: int) -> tuple:
     )
 
 
+def load_pyplot():
+    """
+    Import matplotlib.pyplot on first use, as importing matplotlib is slow
+    and not needed unless a graph is drawn.
+    """
+    import matplotlib
+
+    # Use a non-interactive backend for matplotlib.
+    # No need to show plots, just save them.
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
 def get_node_colors_and_legend(graph: nx.DiGraph, cmap_id: str) -> tuple[list, list]:
     """
     Assign colors to nodes based on their sheet and create legend patches.
     """
+    import matplotlib.patches as mpatches
+
+    plt = load_pyplot()
     sheets = {data.get("sheet", "Sheet1") for _, data in graph.nodes(data=True)}
     color_map = plt.get_cmap(cmap_id, len(sheets))
 
@@ -142,6 +163,46 @@ def get_node_colors_and_legend(graph: nx.DiGraph, cmap_id: str) -> tuple[list, l
     return node_colors, legend_patches
 
 
+def limit_graph_size(
+    graph: nx.Graph, max_nodes: int = MAX_VISUALIZED_NODES
+) -> nx.Graph:
+    """
+    Reduce the graph to the subgraph of its max_nodes most connected nodes.
+    Graphs that are small enough are returned as they are.
+    """
+    if graph.number_of_nodes() <= max_nodes:
+        return graph
+
+    logger.warning(
+        f"The graph has {graph.number_of_nodes()} nodes. "
+        f"Only the {max_nodes} most connected nodes will be visualized."
+    )
+    top_nodes = {
+        node for node, _ in heapq.nlargest(max_nodes, graph.degree(), key=itemgetter(1))
+    }
+    return graph.subgraph(top_nodes)
+
+
+def spring_layout(graph: nx.Graph) -> dict:
+    """
+    Calculate a force-directed layout, using a faster method for large graphs.
+    """
+    if graph.number_of_nodes() < FAST_LAYOUT_MIN_NODES:
+        return nx.spring_layout(graph)
+
+    try:
+        return nx.nx_agraph.graphviz_layout(graph, prog="sfdp")
+    except ImportError:
+        logger.info("pygraphviz is not installed, using a reduced spring layout.")
+    except (OSError, ValueError) as e:
+        # pygraphviz raises ValueError if the sfdp program is not found
+        logger.warning(
+            f"Graphviz sfdp layout failed, using a reduced spring layout.\n{e}"
+        )
+
+    return nx.spring_layout(graph, iterations=20, seed=0)
+
+
 def visualize_dependency_graph(
     graph: nx.DiGraph,
     output_path: str = None,
@@ -152,6 +213,8 @@ def visualize_dependency_graph(
     """
     Render the dependency graph using matplotlib and networkx.
     """
+    plt = load_pyplot()
+    graph = limit_graph_size(graph)
 
     # Set the default settings for the graph visualization based on the number of nodes
     graph_settings = get_graph_default_settings(len(graph.nodes), config_path)
@@ -176,7 +239,7 @@ def visualize_dependency_graph(
 
     # Choose layout based on input
     if layout == "spring":
-        pos = nx.spring_layout(graph)
+        pos = spring_layout(graph)
     elif layout == "kamada_kawai":
         pos = nx.kamada_kawai_layout(graph)
     elif layout == "circular":
@@ -187,7 +250,7 @@ def visualize_dependency_graph(
         pos = nx.spectral_layout(graph)
     else:
         logger.warning(f"Unknown layout '{layout}'. Falling back to spring layout.")
-        pos = nx.spring_layout(graph)
+        pos = spring_layout(graph)
 
     # Assign colors and get legend patches
     node_colors, legend_patches = get_node_colors_and_legend(
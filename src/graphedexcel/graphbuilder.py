@@ -2,57 +2,229 @@
 This script extracts formulas from an Excel file and builds a dependency graph.
 """
 
-from typing import List, Dict
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple, Union
 from openpyxl import load_workbook
 import networkx as nx
+import os
 import re
 import sys
-from .excel_parser import extract_references
+from .excel_parser import clear_caches, extract_references, iter_formulas
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Regex to detect function calls like SUM( in a formula, capturing the function name.
+# The lookbehind only lets a match start at the beginning of a run of letters,
+# which keeps matching linear on long runs that are not followed by "(".
+_FUNC_RE = re.compile(r"(?<![A-Z])([A-Z]+)\(")
 
-# Dictionary that stores the unique functions used in the formulas
+
+# Counter that stores the unique functions used in the formulas
 # The key will be the function name and the value will be the number of times it was used
-functions_dict: Dict[str, int] = {}
+functions_dict: Counter[str] = Counter()
+
+# Workbooks at least this size (in bytes) with more than one sheet are parsed
+# in parallel. Below it, starting the workers costs more than it saves.
+PARALLEL_MIN_FILE_SIZE = 1024 * 1024
+
+
+class DependencyCollector:
+    """
+    Collects nodes and edges in plain dicts while the workbook is parsed.
+
+    It supports the subset of the networkx graph API used by the functions
+    in this module, so they work on either. The networkx graph is built
+    in one go by to_graph() once all sheets are processed.
+    """
+
+    def __init__(self) -> None:
+        # node -> successors, kept as dict keys to get an ordered set
+        self.successors: Dict[str, Dict[str, None]] = defaultdict(dict)
+        # node -> sheet name. The sheet names are interned, as they are
+        # otherwise sliced out of each reference as a new string per node.
+        self.node_sheets: Dict[str, str] = {}
+
+    def add_node(self, node: str, sheet: str) -> None:
+        self.node_sheets[node] = sys.intern(sheet)
+
+    def add_edge(self, source: str, target: str) -> None:
+        self.successors[source][target] = None
+
+    def merge(
+        self, node_sheets: Dict[str, str], successors: Dict[str, Dict[str, None]]
+    ) -> None:
+        """
+        Merge the nodes and edges collected by another collector.
+        """
+        for node, sheet in node_sheets.items():
+            # Strings coming back from a worker process are new objects
+            self.node_sheets[node] = sys.intern(sheet)
+        for source, targets in successors.items():
+            self.successors[source].update(targets)
+
+    def to_graph(self, directed: bool = True) -> nx.Graph:
+        """
+        Build a networkx DiGraph, or an undirected Graph, from the collected
+        nodes and edges. Self-loops and nodes without any other connection
+        are left out, so they never have to be removed from the graph.
+        """
+        # A node is connected if it has an edge to another node, or is the
+        # target of one. Checked per source, so no edge list is built.
+        connected = set()
+        for source, targets in self.successors.items():
+            if len(targets) > (source in targets):
+                connected.add(source)
+                connected.update(targets)
+
+        graph = nx.DiGraph() if directed else nx.Graph()
+        graph.add_nodes_from(
+            (node, {"sheet": sheet})
+            for node, sheet in self.node_sheets.items()
+            if node in connected
+        )
+        graph.add_edges_from(
+            (source, target)
+            for source, targets in self.successors.items()
+            for target in targets
+            if source != target
+        )
+        return graph
+
+
+# Anything the graph building functions can add nodes and edges to
+GraphLike = Union[nx.DiGraph, DependencyCollector]
 
 
 def build_graph_and_stats(
     file_path: str,
     as_directed: bool = False,
+    parallel: Optional[bool] = False,
 ) -> tuple[nx.DiGraph, Dict[str, int]]:
     """
     Extract formulas from an Excel file and build a dependency graph.
+
+    Sheets are parsed in separate processes if parallel is True. Starting
+    the worker processes needs an `if __name__ == "__main__":` guard in the
+    calling script on platforms that do not fork, so it is off by default.
+    If parallel is None, it is only done for workbooks with more than one
+    sheet whose file is at least PARALLEL_MIN_FILE_SIZE bytes, when more
+    than one CPU is usable. The workers open the workbook by path, so
+    file-like objects are then parsed serially.
     """
     try:
-        wb = load_workbook(file_path, data_only=False, read_only=True)
+        wb = load_workbook(file_path, data_only=False, read_only=True, keep_links=False)
     except Exception as e:
         logger.error(f"Error loading workbook: {e}")
         sys.exit(1)
 
-    graph = nx.DiGraph()
-
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        logger.debug(f"========== Analyzing sheet: {sheet_name} ==========")
-        sanitized_sheet_name = sanitize_sheetname(sheet_name)
-        process_sheet(ws, sanitized_sheet_name, graph)
-
-    if not as_directed:
-        # Convert the graph to an undirected graph
-        graph = graph.to_undirected()
+    collector = DependencyCollector()
+    sheet_names = wb.sheetnames
+
+    if parallel is None:
+        parallel = (
+            isinstance(file_path, (str, os.PathLike))
+            and len(sheet_names) > 1
+            and usable_cpu_count() > 1
+            and os.path.getsize(file_path) >= PARALLEL_MIN_FILE_SIZE
+        )
+
+    if parallel:
+        # The workers open the workbook themselves
+        wb.close()
+        process_sheets_in_parallel(file_path, sheet_names, collector)
     else:
+        try:
+            for sheet_name in sheet_names:
+                ws = wb[sheet_name]
+                logger.debug(f"========== Analyzing sheet: {sheet_name} ==========")
+                sanitized_sheet_name = sanitize_sheetname(sheet_name)
+                process_sheet(ws, sanitized_sheet_name, collector)
+        finally:
+            # read-only workbooks keep the underlying zip file open until closed
+            wb.close()
+            # The caches only help within one workbook
+            clear_caches()
+
+    if as_directed:
         logger.info("Preserving the graph as a directed graph.")
 
-    # remove selfloops
-    graph.remove_edges_from(nx.selfloop_edges(graph))
-
-    graph.remove_nodes_from(list(nx.isolates(graph)))
+    # Build the graph without selfloops and isolated nodes
+    graph = collector.to_graph(directed=as_directed)
 
     return graph, functions_dict
 
 
+def usable_cpu_count() -> int:
+    """
+    Get the number of CPUs this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def process_sheets_in_parallel(
+    file_path: str, sheet_names: List[str], collector: DependencyCollector
+) -> None:
+    """
+    Parse each sheet in a worker process and merge the results into the
+    collector and functions_dict, in sheet order.
+    """
+    max_workers = min(len(sheet_names), usable_cpu_count())
+    logger.info(f"Analyzing {len(sheet_names)} sheets using {max_workers} processes.")
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=open_workbook_in_worker,
+        initargs=(file_path,),
+    ) as executor:
+        for node_sheets, successors, sheet_functions in executor.map(
+            parse_sheet_in_worker, sheet_names
+        ):
+            collector.merge(node_sheets, successors)
+            functions_dict.update(sheet_functions)
+
+
+# The workbook opened by open_workbook_in_worker, used for all sheets a
+# worker process parses
+_worker_workbook = None
+
+
+def open_workbook_in_worker(file_path: str) -> None:
+    """
+    Open the workbook once per worker process.
+
+    It stays open for the lifetime of the worker and the file handle is
+    released when the worker process exits.
+    """
+    global _worker_workbook
+    _worker_workbook = load_workbook(
+        file_path, data_only=False, read_only=True, keep_links=False
+    )
+
+
+def parse_sheet_in_worker(
+    sheet_name: str,
+) -> Tuple[Dict[str, str], Dict[str, Dict[str, None]], Counter[str]]:
+    """
+    Parse a single sheet and return its nodes, edges and function counts.
+
+    Meant to run in a worker process set up by open_workbook_in_worker,
+    as it resets the process-wide functions_dict.
+    """
+    functions_dict.clear()
+    collector = DependencyCollector()
+
+    logger.debug(f"========== Analyzing sheet: {sheet_name} ==========")
+    process_sheet(
+        _worker_workbook[sheet_name], sanitize_sheetname(sheet_name), collector
+    )
+
+    return collector.node_sheets, dict(collector.successors), Counter(functions_dict)
+
+
 def sanitize_sheetname(sheetname: str) -> str:
     """
     Remove any special characters from the sheet name.
@@ -72,7 +244,7 @@ def sanitize_range(rangestring: str) -> str:
     Remove any special characters from the range.
     """
     if "!" in rangestring:
-        sheet, range_ = rangestring.split("!")
+        sheet, range_ = rangestring.rsplit("!", 1)
         sheet = sheet.replace("'", "")
         return f"{sheet}!{range_}"
     return rangestring
@@ -80,94 +252,108 @@ def sanitize_range(rangestring: str) -> str:
 
 def stat_functions(cellvalue: str) -> None:
     """
-    Extract the functions used in the formula and store them in a dictionary.
+    Extract the functions used in the formula and count them in functions_dict.
     This will be used to print the most used functions in the formulas.
     """
-    cellfuncs = re.findall(r"[A-Z]+\(", cellvalue)
-    logger.debug(f"  Functions used: {functions_dict}")
-    for function in cellfuncs:
-        function = function[:-1]  # Remove the "(" from the function name
-        functions_dict[function] = functions_dict.get(function, 0) + 1
+    functions_dict.update(_FUNC_RE.findall(cellvalue))
 
 
-def add_node(graph: nx.DiGraph, node: str, sheet: str) -> None:
+def add_node(graph: GraphLike, node: str, sheet: str) -> None:
     """
     Add a node to the graph with the specified sheet name.
     """
-    logger.debug(f"Adding node: {node} in sheet: {sheet}")
-    sheet = sanitize_sheetname(sheet)
-    node = sanitize_nodename(node)
-    graph.add_node(node, sheet=sheet)
+    graph.add_node(sanitize_nodename(node), sheet=sanitize_sheetname(sheet))
 
 
-def process_sheet(ws, sheet_name: str, graph: nx.DiGraph) -> None:
+def process_sheet(ws, sheet_name: str, graph: GraphLike) -> None:
     """
     Process a sheet and add references to the graph.
     """
-    for row in ws.iter_rows():
-        for cell in row:
-            if isinstance(cell.value, str) and cell.value.startswith("="):
-                process_formula_cell(cell, sheet_name, graph)
-
-
-def process_formula_cell(cell, sheet_name: str, graph: nx.DiGraph) -> None:
+    # Checked once per sheet. The per-formula debug logging is only done when
+    # asked for (--verbose), as it costs more than the parsing itself.
+    verbose = logger.isEnabledFor(logging.DEBUG)
+    for coordinate, formula in iter_formulas(ws):
+        process_formula_cell(coordinate, formula, sheet_name, graph, verbose)
+
+
+def process_formula_cell(
+    coordinate: str,
+    formula: str,
+    sheet_name: str,
+    graph: GraphLike,
+    verbose: bool = False,
+) -> None:
     """
     Process a cell containing a formula.
     """
-    stat_functions(cell.value)
-    cell_reference = f"{sheet_name}!{cell.coordinate}"
-    logger.debug(f"Formula in {cell_reference}: {cell.value}")
+    stat_functions(formula)
+    cell_reference = f"{sheet_name}!{coordinate}"
     add_node(graph, cell_reference, sheet_name)
 
     direct_references, range_references, range_dependencies = extract_references(
-        cell.value
+        formula
     )
+    if verbose:
+        logger.debug(
+            f"Formula in {cell_reference}: {formula}\n"
+            f"  Cells: {direct_references}\n"
+            f"  Ranges: {range_references}"
+        )
     add_references_to_graph(direct_references, cell_reference, sheet_name, graph)
     add_ranges_to_graph(range_references, cell_reference, sheet_name, graph)
     add_range_dependencies_to_graph(range_dependencies, sheet_name, graph)
 
 
 def add_references_to_graph(
-    references: List[str], current_cell: str, sheet_name: str, graph: nx.DiGraph
+    references: List[str], current_cell: str, sheet_name: str, graph: GraphLike
 ) -> None:
     """
     Add direct cell references to the graph.
     """
+    seen = set()
     for cell_reference in references:
         cell_reference = format_reference(cell_reference, sheet_name)
-        logger.debug(f"  Cell: {cell_reference}")
+        if cell_reference in seen:
+            continue
+        seen.add(cell_reference)
         add_node(graph, cell_reference, sheet_name)
         graph.add_edge(current_cell, cell_reference)
 
 
 def add_ranges_to_graph(
-    ranges: List[str], current_cell: str, sheet_name: str, graph: nx.DiGraph
+    ranges: List[str], current_cell: str, sheet_name: str, graph: GraphLike
 ) -> None:
     """
     Add range references to the graph.
     """
+    seen = set()
     for range_reference in ranges:
         range_sheet_name = get_range_sheet_name(range_reference, sheet_name)
         range_reference = format_reference(range_reference, sheet_name)
-        logger.debug(f"  Range: {range_reference}")
+        if range_reference in seen:
+            continue
+        seen.add(range_reference)
         add_node(graph, range_reference, range_sheet_name)
         graph.add_edge(current_cell, range_reference)
 
 
 def add_range_dependencies_to_graph(
-    range_dependencies: Dict[str, str], sheet_name: str, graph: nx.DiGraph
+    range_dependencies: Dict[str, str], sheet_name: str, graph: GraphLike
 ) -> None:
     """
     Add dependencies between ranges and cells.
     """
+    added_ranges = set()
     for cell_reference, range_reference in range_dependencies.items():
         range_reference = format_reference(range_reference, sheet_name)
         cell_reference = format_reference(cell_reference, sheet_name)
-        range_sheet_name = range_reference.split("!")[0]
-        cell_sheet_name = cell_reference.split("!")[0]
+        cell_sheet_name = cell_reference.rpartition("!")[0]
 
         add_node(graph, cell_reference, cell_sheet_name)
-        add_node(graph, range_reference, range_sheet_name)
+        # A range maps to many cells, only add its node once
+        if range_reference not in added_ranges:
+            added_ranges.add(range_reference)
+            add_node(graph, range_reference, range_reference.rpartition("!")[0])
         graph.add_edge(range_reference, cell_reference)
 
 
@@ -186,4 +372,7 @@ def get_range_sheet_name(range_reference: str, sheet_name: str) -> str:
     """
     Get the sheet name for a range reference.
     """
-    return sheet_name if "!" not in range_reference else range_reference.split("!")[0]
+    # Sheet names may contain "!", so the range starts after the last one
+    return (
+        sheet_name if "!" not in range_reference else range_reference.rpartition("!")[0]
+    )
@@ -1,5 +1,6 @@
 # logger_config.py
 
+import copy
 import logging
 import logging.config
 
@@ -37,12 +38,28 @@ logging_config = {
     },
     "loggers": {
         "graphedexcel": {
-            "handlers": ["console", "file"],
-            "level": "DEBUG",
+            "handlers": ["console"],
+            "level": "INFO",
             "propagate": False,
         },
     },
     "root": {"handlers": ["minimalconsole"], "level": "WARNING"},
 }
 
-logging.config.dictConfig(logging_config)
+
+def configure_logging(verbose: bool = False) -> None:
+    """
+    Set up logging for the command line tool.
+
+    With verbose, the graphedexcel logger is set to DEBUG and also writes
+    to app.log in the current directory. Otherwise app.log is not touched.
+    """
+    config = copy.deepcopy(logging_config)
+    if verbose:
+        package_config = config["loggers"]["graphedexcel"]
+        package_config["handlers"].append("file")
+        package_config["level"] = "DEBUG"
+    else:
+        # dictConfig opens the files of all handlers, even unused ones
+        del config["handlers"]["file"]
+    logging.config.dictConfig(config)
@@ -1,4 +1,5 @@
 import os
+import logging
 import tempfile
 from openpyxl import Workbook
 import pytest
@@ -24,6 +25,24 @@ def create_excel_file(tmp_path):
     return _create_excel_file
 
 
+@pytest.fixture(autouse=True)
+def restore_logging():
+    """
+    Undo the logging setup done by main(), so it does not leak into other
+    test modules.
+    """
+    package_logger = logging.getLogger("graphedexcel")
+    handlers = package_logger.handlers[:]
+    level, propagate = package_logger.level, package_logger.propagate
+    yield
+    for handler in package_logger.handlers:
+        if handler not in handlers:
+            handler.close()
+    package_logger.handlers = handlers
+    package_logger.setLevel(level)
+    package_logger.propagate = propagate
+
+
 # test cli.main
 def test_main():
     # assert that main with no arguments raises SystemExit error
@@ -64,6 +83,57 @@ def test_main_with_test_xlsx_file(capsys):
     assert "Dependency graph image saved" in captured.out
 
 
+def test_main_verbose_writes_formulas_to_app_log(
+    create_excel_file, tmp_path, monkeypatch
+):
+    file_path = create_excel_file({"Sheet1": [["=B1+C1", "=SUM(D1:D3)"]]})
+    monkeypatch.chdir(tmp_path)
+    test_args = ["graphedexcel", str(file_path), "--verbose", "--no-visualize"]
+    with patch("sys.argv", test_args):
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+        assert exc_info.value.code == 0
+
+    for handler in logging.getLogger("graphedexcel").handlers:
+        handler.flush()
+    app_log = (tmp_path / "app.log").read_text(encoding="utf8")
+    assert "Formula in Sheet1!A1: =B1+C1" in app_log
+    assert "Formula in Sheet1!B1: =SUM(D1:D3)" in app_log
+
+
+def test_main_without_verbose_does_not_write_app_log(
+    create_excel_file, tmp_path, monkeypatch
+):
+    file_path = create_excel_file({"Sheet1": [["=B1+C1"]]})
+    monkeypatch.chdir(tmp_path)
+    test_args = ["graphedexcel", str(file_path), "--no-visualize"]
+    with patch("sys.argv", test_args):
+        with pytest.raises(SystemExit):
+            main()
+
+    assert not (tmp_path / "app.log").exists()
+
+
+@pytest.mark.parametrize("verbose, parallel", [(False, None), (True, False)])
+def test_main_parallel_choice(create_excel_file, verbose, parallel, monkeypatch):
+    """
+    Test that main() lets larger workbooks be parsed in parallel, except
+    with --verbose.
+    """
+    file_path = create_excel_file({"Sheet1": [["=B1"]]})
+    monkeypatch.chdir(file_path.parent)
+    test_args = ["graphedexcel", str(file_path), "--no-visualize"]
+    if verbose:
+        test_args.append("--verbose")
+    with patch("sys.argv", test_args), patch(
+        "graphedexcel.cli.build_graph_and_stats",
+        return_value=(MagicMock(), {}),
+    ) as build, patch("graphedexcel.cli.print_summary"):
+        with pytest.raises(SystemExit):
+            main()
+    assert build.call_args.kwargs["parallel"] is parallel
+
+
 def test_parse_arguments_required(monkeypatch):
     """
     Test that the required positional argument is parsed correctly.
@@ -84,6 +154,7 @@ def test_parse_arguments_optional_flags():
         "--as-directed-graph",
         "--no-visualize",
         "--hide-legends",
+        "--verbose",
     ]
     with patch("sys.argv", test_args):
         args = parse_arguments()
@@ -91,6 +162,7 @@ def test_parse_arguments_optional_flags():
         assert args.as_directed_graph is True
         assert args.no_visualize is True
         assert args.hide_legends is True
+        assert args.verbose is True
 
 
 def test_parse_arguments_optional_arguments():
@@ -131,6 +203,7 @@ def test_parse_arguments_default_values():
         assert args.no_visualize is False
         assert args.open_image is False
         assert args.hide_legends is None
+        assert args.verbose is False
 
 
 def test_parse_arguments_invalid():
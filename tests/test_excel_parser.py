@@ -1,5 +1,13 @@
+from io import BytesIO
+from openpyxl import Workbook
+from openpyxl.worksheet.formula import ArrayFormula
 import pytest
-from graphedexcel.excel_parser import extract_references
+from graphedexcel.excel_parser import (
+    extract_references,
+    iter_formulas,
+    iter_sheet_xml_formulas,
+    scan_references,
+)
 
 
 # Helper function to assert references
@@ -23,8 +31,31 @@ def assert_references(formula, expected_direct, expected_range, expected_deps):
         ("=SUM(A2:A4)", [], ["A2:A4"], {"A2": "A2:A4", "A3": "A2:A4", "A4": "A2:A4"}),
         # Test for simple absolute references like $A$1, $B$2
         ("=$A$1+$B$2", ["A1", "B2"], [], {}),
+        # Test for mixed absolute references like $A1, A$1
+        (
+            "=$A1+B$2+$C3:D$4",
+            ["A1", "B2"],
+            ["C3:D4"],
+            {"C3": "C3:D4", "C4": "C3:D4", "D3": "C3:D4", "D4": "C3:D4"},
+        ),
         # Test for sheet qualified absolute references like Sheet2!$A$1, Sheet2!$B$2
         ("=Sheet2!$A$1+Sheet2!$B$2", ["Sheet2!A1", "Sheet2!B2"], [], {}),
+        # Test for quoted sheet names with spaces and escaped quotes
+        ("='My Sheet'!A1+'O''Brien'!$B$2", ["'My Sheet'!A1", "'O''Brien'!B2"], [], {}),
+        # Test for quoted sheet names containing "!"
+        ("='Q1!Data'!A1", ["'Q1!Data'!A1"], [], {}),
+        (
+            "=SUM('Q1!Data'!A1:A3)",
+            [],
+            ["'Q1!Data'!A1:A3"],
+            {
+                "'Q1!Data'!A1": "'Q1!Data'!A1:A3",
+                "'Q1!Data'!A2": "'Q1!Data'!A1:A3",
+                "'Q1!Data'!A3": "'Q1!Data'!A1:A3",
+            },
+        ),
+        # Test that function names, identifiers and string literals are skipped
+        ('=LOG10(A1)+ABCD1+LEN("B2")', ["A1"], [], {}),
     ],
 )
 def test_references(formula, expected_direct, expected_range, expected_deps):
@@ -144,3 +175,107 @@ def test_mixed_references():
         "Sheet2!B3": "Sheet2!A1:B3",
     }
     assert_references(formula, expected_direct, expected_range, expected_deps)
+
+
+def sheet_xml(rows):
+    return BytesIO(
+        (
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f"<sheetData>{rows}</sheetData></worksheet>"
+        ).encode()
+    )
+
+
+def test_sheet_xml_formulas():
+    """
+    Test that only cells with formulas are yielded from the sheet XML.
+    """
+    source = sheet_xml(
+        '<row r="1"><c r="A1"><v>1</v></c><c r="B1"><f>A1*2</f><v>2</v></c></row>'
+        '<row r="2"><c r="A2" t="s"><v>0</v></c><c r="B2"><f>SUM(A1:A2)</f></c></row>'
+    )
+    assert list(iter_sheet_xml_formulas(source)) == [
+        ("B1", "=A1*2"),
+        ("B2", "=SUM(A1:A2)"),
+    ]
+
+
+def test_sheet_xml_shared_formulas():
+    """
+    Test that shared formulas are translated to the cells using them.
+    """
+    source = sheet_xml(
+        '<row r="1"><c r="B1"><f t="shared" ref="B1:B3" si="0">A1*2</f></c></row>'
+        '<row r="2"><c r="B2"><f t="shared" si="0"/></c></row>'
+        '<row r="3"><c r="B3"><f t="shared" si="0"/></c></row>'
+    )
+    assert list(iter_sheet_xml_formulas(source)) == [
+        ("B1", "=A1*2"),
+        ("B2", "=A2*2"),
+        ("B3", "=A3*2"),
+    ]
+
+
+def test_sheet_xml_formulas_without_cell_references():
+    """
+    Test that cell coordinates are derived when the optional r attributes are missing.
+    """
+    source = sheet_xml(
+        "<row><c><v>1</v></c><c><f>A1</f></c></row>"
+        '<row r="3"><c r="B3"><v>1</v></c><c><f>B3</f></c></row>'
+    )
+    assert list(iter_sheet_xml_formulas(source)) == [("B1", "=A1"), ("C3", "=B3")]
+
+
+def test_cached_references_are_not_shared_between_calls():
+    """
+    Test that the lists and dict returned for a cached formula can be changed safely.
+    """
+    direct_references, range_references, deps = extract_references("=A1+SUM(B1:B2)")
+    direct_references.append("C1")
+    range_references.clear()
+    deps.clear()
+
+    assert_references(
+        "=A1+SUM(B1:B2)", ["A1"], ["B1:B2"], {"B1": "B1:B2", "B2": "B1:B2"}
+    )
+
+
+@pytest.mark.parametrize(
+    "formula, expected",
+    [
+        # Unterminated quoted sheet name
+        ("='" + "a" * 100_000, ()),
+        # Long identifier without a sheet separator
+        ("=" + "x" * 100_000 + "B1", ()),
+        ("=" + "x1" * 100_000 + "+B1", ("B1",)),
+        # Repeated escaped quotes, with and without the closing quote
+        ("='" + "''" * 100_000, ()),
+        ("='" + "''" * 100_000 + "'!A1", ("'" + "''" * 100_000 + "'!A1",)),
+    ],
+    ids=["open-quote", "word", "word-then-ref", "open-escapes", "quoted-escapes"],
+)
+def test_scan_references_long_input(formula, expected):
+    """
+    Test that long inputs which could make the regex backtrack are handled quickly.
+    """
+    assert scan_references.__wrapped__(formula) == expected
+
+
+def test_iter_formulas_from_worksheet():
+    """
+    Test that formulas are found in a worksheet that is not read-only.
+    """
+    wb = Workbook()
+    ws = wb.active
+    ws["A1"] = 1
+    ws["B1"] = "=A1*2"
+    ws["C5"] = "text"
+    ws["D9"] = "=SUM(A1:B1)"
+    ws["E1"] = ArrayFormula("E1:E2", "=A1:A2*2")
+
+    assert sorted(iter_formulas(ws)) == [
+        ("B1", "=A1*2"),
+        ("D9", "=SUM(A1:B1)"),
+        ("E1", "=A1:A2*2"),
+    ]
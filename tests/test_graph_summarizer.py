@@ -31,3 +31,12 @@ def test_empty_functionsdict():
 
     print_summary(G, {})
     assert True
+
+
+# functions are listed by how often they are used
+def test_functions_sorted_by_count(capsys):
+    G = nx.DiGraph()
+    print_summary(G, {"IF": 1, "SUM": 5, "AVERAGE": 3})
+
+    output = capsys.readouterr().out
+    assert output.index("SUM") < output.index("AVERAGE") < output.index("IF")
@@ -6,6 +6,8 @@ from graphedexcel.graph_visualizer import (
     get_graph_default_settings,
     get_node_colors_and_legend,
     visualize_dependency_graph,
+    limit_graph_size,
+    spring_layout,
 )
 import networkx as nx
 
@@ -102,23 +104,58 @@ def test_invalid_json_in_config_will_not_break(tmp_path, caplog):
     assert file_path.with_suffix(".png").exists()
 
 
-def test_all_layouts():
+def test_all_layouts(tmp_path):
     G = create_two_node_graph()
 
     for layout in ["spring", "kamada_kawai", "circular", "shell", "spectral"]:
-        visualize_dependency_graph(G, layout=layout, output_path=layout + "_layout.png")
+        visualize_dependency_graph(
+            G, layout=layout, output_path=str(tmp_path / f"{layout}_layout.png")
+        )
 
 
-def test_provided_hide_legends_override():
+def test_provided_hide_legends_override(tmp_path):
     G = create_two_node_graph()
     visualize_dependency_graph(
-        G, hide_legends_override=True, output_path="hide_legends.png"
+        G, hide_legends_override=True, output_path=str(tmp_path / "hide_legends.png")
     )
 
 
-def test_unknown_layout_will_fallback():
+def test_unknown_layout_will_fallback(tmp_path):
     G = create_two_node_graph()
-    visualize_dependency_graph(G, layout="nosuchlayout", output_path="nosuchlayout.png")
+    visualize_dependency_graph(
+        G, layout="nosuchlayout", output_path=str(tmp_path / "nosuchlayout.png")
+    )
+
+
+def test_limit_graph_size_keeps_most_connected_nodes(caplog):
+    G = nx.star_graph(10)
+    G.add_edge(11, 12)
+
+    with caplog.at_level(logging.WARNING):
+        limited = limit_graph_size(G, max_nodes=3)
+    assert "Only the 3 most connected nodes" in caplog.text
+    assert 0 in limited.nodes
+    assert limited.number_of_nodes() == 3
+
+    assert limit_graph_size(G) is G
+
+
+def test_spring_layout_for_large_graph():
+    G = nx.path_graph(600)
+    pos = spring_layout(G)
+    assert len(pos) == 600
+
+
+def test_spring_layout_falls_back_when_sfdp_fails(monkeypatch, caplog):
+    def missing_sfdp(graph, prog):
+        raise ValueError(f"Program {prog} not found in path.")
+
+    monkeypatch.setattr(nx.nx_agraph, "graphviz_layout", missing_sfdp)
+    G = nx.path_graph(600)
+    with caplog.at_level(logging.WARNING):
+        pos = spring_layout(G)
+    assert len(pos) == 600
+    assert "Program sfdp not found in path" in caplog.text
 
 
 def create_two_node_graph():
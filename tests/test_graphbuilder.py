@@ -12,8 +12,12 @@ from graphedexcel.graphbuilder import (
     add_node,
     build_graph_and_stats,
     functions_dict,
+    add_references_to_graph,
+    DependencyCollector,
 )
 from graphedexcel.graphbuilder import sanitize_nodename
+from graphedexcel import graphbuilder
+from graphedexcel.excel_parser import expand_range_cached, scan_references
 
 
 @pytest.fixture(autouse=True)
@@ -53,6 +57,7 @@ def test_sanitize_range():
     assert sanitize_range("'Sheet1'!A1:B2") == "Sheet1!A1:B2"
     assert sanitize_range("A1:B2") == "A1:B2"
     assert sanitize_range("'Data Sheet'!C3") == "Data Sheet!C3"
+    assert sanitize_range("'Q1!Data'!A1:A3") == "Q1!Data!A1:A3"
 
 
 def test_stat_functions():
@@ -74,6 +79,14 @@ def test_stat_functions():
     assert functions_dict.get("SUM") == 4  # SUM incremented again
 
 
+def test_stat_functions_long_uppercase_text():
+    """
+    Test that a long run of capitals without a function call is handled quickly.
+    """
+    stat_functions('="' + "A" * 100_000 + '"')
+    assert functions_dict == {}
+
+
 def test_add_node():
     """
     Test the add_node function to ensure nodes are added with
@@ -100,6 +113,56 @@ def test_add_node():
     assert graph.nodes["Sheet3!C1"]["sheet"] == "Sheet3"
 
 
+def test_add_references_to_graph_skips_duplicates():
+    """
+    Test that a reference used several times in a formula is only added once.
+    """
+    graph = nx.DiGraph()
+    add_references_to_graph(
+        ["A1", "A1", "Sheet1!A1", "B1"], "Sheet1!C1", "Sheet1", graph
+    )
+
+    assert set(graph.nodes) == {"Sheet1!A1", "Sheet1!B1", "Sheet1!C1"}
+    assert list(graph.edges) == [("Sheet1!C1", "Sheet1!A1"), ("Sheet1!C1", "Sheet1!B1")]
+
+
+def test_dependency_collector_to_graph():
+    """
+    Test that the collector builds the same graph as adding to a DiGraph directly.
+    """
+    collector = DependencyCollector()
+    graph = nx.DiGraph()
+    for target in (collector, graph):
+        add_node(target, "Sheet1!A1", "Sheet1")
+        add_references_to_graph(
+            ["B1", "Sheet2!C1", "B1"], "Sheet1!A1", "Sheet1", target
+        )
+
+    collected = collector.to_graph()
+    assert dict(collected.nodes(data=True)) == dict(graph.nodes(data=True))
+    assert list(collected.edges) == list(graph.edges)
+
+
+def test_dependency_collector_skips_selfloops_and_isolates():
+    """
+    Test that self-loops and nodes left without edges are not part of the graph.
+    """
+    collector = DependencyCollector()
+    for node in ("Sheet1!A1", "Sheet1!B1", "Sheet1!C1"):
+        collector.add_node(node, sheet="Sheet1")
+    collector.add_edge("Sheet1!A1", "Sheet1!A1")
+    collector.add_edge("Sheet1!A1", "Sheet1!B1")
+    collector.add_edge("Sheet1!B1", "Sheet1!A1")
+
+    directed = collector.to_graph()
+    assert list(directed.nodes) == ["Sheet1!A1", "Sheet1!B1"]
+    assert directed.number_of_edges() == 2
+
+    undirected = collector.to_graph(directed=False)
+    assert not undirected.is_directed()
+    assert undirected.number_of_edges() == 1
+
+
 @pytest.fixture
 def create_excel_file(tmp_path):
     def _create_excel_file(data):
@@ -188,3 +251,114 @@ def test_undirected_graph(create_excel_file):
     assert len(graph.nodes) == 2
     assert len(graph.edges) == 1
     assert functions_dict == {}
+
+
+def test_build_clears_reference_caches(create_excel_file):
+    data = {"Sheet1": [["=SUM(A1:A3)", "=B1+C1"]]}
+    file_path = create_excel_file(data)
+    build_graph_and_stats(file_path, parallel=False)
+
+    assert scan_references.cache_info().currsize == 0
+    assert expand_range_cached.cache_info().currsize == 0
+
+
+def test_build_graph_with_exclamation_mark_in_sheet_name(create_excel_file):
+    data = {
+        "Q1!Data": [[1], [2], [3]],
+        "Sheet2": [["=SUM('Q1!Data'!A1:A3)", "='Q1!Data'!B1"]],
+    }
+    file_path = create_excel_file(data)
+
+    graph, _ = build_graph_and_stats(file_path, as_directed=True)
+
+    assert graph.nodes["Q1!Data!A1:A3"]["sheet"] == "Q1!Data"
+    assert graph.nodes["Q1!Data!A2"]["sheet"] == "Q1!Data"
+    assert graph.has_edge("Sheet2!A1", "Q1!Data!A1:A3")
+    assert graph.has_edge("Q1!Data!A1:A3", "Q1!Data!A2")
+    assert graph.has_edge("Sheet2!B1", "Q1!Data!B1")
+
+
+def test_parallel_build_matches_serial_build(create_excel_file):
+    data = {
+        "Sheet1": [["=SUM(A2:A3)", "=Sheet2!A1"]],
+        "Sheet2": [["=B1+C1", "=MAX(Sheet1!A1:B1)"]],
+    }
+    file_path = create_excel_file(data)
+
+    serial_graph, serial_functions = build_graph_and_stats(
+        file_path, as_directed=True, parallel=False
+    )
+    serial_functions = dict(serial_functions)
+    functions_dict.clear()
+    parallel_graph, parallel_functions = build_graph_and_stats(
+        file_path, as_directed=True, parallel=True
+    )
+
+    assert dict(parallel_graph.nodes(data=True)) == dict(serial_graph.nodes(data=True))
+    assert list(parallel_graph.edges) == list(serial_graph.edges)
+    assert parallel_functions == serial_functions == {"SUM": 1, "MAX": 1}
+
+
+@pytest.mark.parametrize(
+    "sheet_count, cpus, min_file_size, expected",
+    [
+        (2, 2, 0, True),
+        (2, 1, 0, False),  # a single CPU
+        (1, 2, 0, False),  # a single sheet
+        (2, 2, 10**9, False),  # a small file
+    ],
+)
+def test_parallel_auto(
+    create_excel_file, monkeypatch, sheet_count, cpus, min_file_size, expected
+):
+    """
+    Test when build_graph_and_stats chooses to parse sheets in parallel.
+    """
+    # The fixture's workbook always has the default "Sheet" as well
+    data = {f"Sheet{i + 2}": [["=B1"]] for i in range(sheet_count - 1)}
+    file_path = create_excel_file(data)
+
+    calls = []
+    monkeypatch.setattr(graphbuilder, "usable_cpu_count", lambda: cpus)
+    monkeypatch.setattr(graphbuilder, "PARALLEL_MIN_FILE_SIZE", min_file_size)
+    monkeypatch.setattr(
+        graphbuilder, "process_sheets_in_parallel", lambda *args: calls.append(args)
+    )
+
+    build_graph_and_stats(file_path, parallel=None)
+    assert bool(calls) is expected
+
+
+def test_parallel_default(create_excel_file, monkeypatch):
+    """
+    Test that sheets are parsed serially unless asked for otherwise.
+    """
+    file_path = create_excel_file({"Sheet1": [["=B1"]], "Sheet2": [["=B1"]]})
+
+    calls = []
+    monkeypatch.setattr(graphbuilder, "usable_cpu_count", lambda: 2)
+    monkeypatch.setattr(graphbuilder, "PARALLEL_MIN_FILE_SIZE", 0)
+    monkeypatch.setattr(
+        graphbuilder, "process_sheets_in_parallel", lambda *args: calls.append(args)
+    )
+
+    build_graph_and_stats(file_path)
+    assert not calls
+
+
+def test_parallel_default_with_file_object(create_excel_file, monkeypatch):
+    """
+    Test that a workbook passed as a file object is parsed serially, even
+    when asked to choose automatically.
+    """
+    file_path = create_excel_file({"Sheet1": [["=B1"]], "Sheet2": [["=B1"]]})
+
+    monkeypatch.setattr(graphbuilder, "usable_cpu_count", lambda: 2)
+    monkeypatch.setattr(graphbuilder, "PARALLEL_MIN_FILE_SIZE", 0)
+
+    with open(file_path, "rb") as f:
+        graph, _ = build_graph_and_stats(f, as_directed=True, parallel=None)
+    assert set(graph.edges) == {
+        ("Sheet1!A1", "Sheet1!B1"),
+        ("Sheet2!A1", "Sheet2!B1"),
+    }